@@ -7,21 +7,41 @@ Sends emails via Gmail API with support for attachments and HTML content.
 import os
 import json
 import base64
+import email.utils
+import hashlib
+import io
 import mimetypes
+import random
 import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from email.generator import BytesGenerator
+from email.headerregistry import Address
+from email.message import EmailMessage, MIMEPart
+from email.policy import SMTP
+from html import escape
 import click
-import markdown
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+# orjson is an optional, faster drop-in for the small JSON files we read and write
+try:
+    import orjson
+    
+    _loads = orjson.loads
+    
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+# The google auth/discovery clients and markdown are imported lazily where
+# they are used, so --help and configuration errors don't pay for them.
 from googleapiclient.errors import HttpError
 
 # Gmail API scopes for sending emails, reading profile, settings, and managing drafts
@@ -33,6 +53,150 @@ SCOPES = [
     'https://www.googleapis.com/auth/gmail.modify'   # For managing drafts
 ]
 
+# Refresh access tokens proactively when they are this close to expiring
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Gmail API services keyed by access token, reused within a process
+_SERVICE_CACHE: Dict[str, Any] = {}
+
+# Socket timeout in seconds for Gmail API requests
+HTTP_TIMEOUT = 30
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# Statuses that mean a request was not acted on. Calls that send mail or
+# create drafts only retry these: after a 500/502/504 the server may have
+# already done the work, and retrying would duplicate it.
+SAFE_RETRY_STATUSES = (429, 503)
+
+# Maximum number of requests sent in one batch HTTP request
+BATCH_SIZE = 50
+
+# Body formats accepted by --input-format and batch file entries
+INPUT_FORMATS = ('markdown', 'html', 'plaintext')
+
+# Partial responses: only the fields the CLI reads are requested
+DRAFT_FIELDS = 'id,message(id,threadId)'
+MESSAGE_FIELDS = 'id,threadId'
+REPLY_SOURCE_FIELDS = 'id,threadId,internalDate,payload'
+
+# Cached sender email and signature are reused for this many seconds by
+# default (override with "profile_cache_ttl" in the config file)
+PROFILE_CACHE_TTL = 24 * 60 * 60
+
+# Parsed credentials keyed by (token file path, mtime) for reuse within a process
+_CREDS_CACHE: Dict[Tuple[str, float], Any] = {}
+
+# Policy for building messages. Bodies are kept 7-bit (quoted-printable or
+# base64 for non-ASCII text) because the client library flattens uploaded
+# message/rfc822 media as ASCII
+MESSAGE_POLICY = SMTP.clone(cte_type='7bit')
+
+# Keys honored from the config file (credentials_file is CLI-only)
+_ALLOWED_CONFIG_KEYS = frozenset(('token_file', 'client_id', 'client_secret', 'profile_cache_ttl'))
+
+# Custom CSS prepended to converted Markdown for better email formatting
+_CSS_STYLES = """
+<style>
+/* Code block styling */
+.highlight {
+    background: #f6f8fa !important;
+    border: 1px solid #d1d9e0 !important;
+    border-radius: 6px !important;
+    padding: 16px !important;
+    margin: 16px 0 !important;
+    overflow-x: auto !important;
+    font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace !important;
+    font-size: 14px !important;
+    line-height: 1.45 !important;
+}
+/* Inline code styling */
+code {
+    background: #f6f8fa !important;
+    padding: 2px 4px !important;
+    border-radius: 3px !important;
+    font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace !important;
+    font-size: 85% !important;
+    color: #d73a49 !important;
+}
+/* Don't style code inside pre blocks */
+pre code {
+    background: transparent !important;
+    padding: 0 !important;
+    border-radius: 0 !important;
+    color: inherit !important;
+}
+/* Table styling */
+table {
+    border-collapse: collapse !important;
+    width: 100% !important;
+    margin: 16px 0 !important;
+}
+th, td {
+    border: 1px solid #d1d9e0 !important;
+    padding: 8px 12px !important;
+    text-align: left !important;
+}
+th {
+    background: #f6f8fa !important;
+    font-weight: bold !important;
+}
+/* Blockquote styling */
+blockquote {
+    border-left: 4px solid #d1d9e0 !important;
+    padding: 0 16px !important;
+    margin: 16px 0 !important;
+    color: #6a737d !important;
+}
+</style>
+"""
+
+# Patterns used by html_to_plain_text, compiled once at import
+_RE_BR = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_RE_DIV_BETWEEN = re.compile(r'</div>\s*<div[^>]*>', re.IGNORECASE)
+_RE_DIV = re.compile(r'</?div[^>]*>', re.IGNORECASE)
+_RE_P_BETWEEN = re.compile(r'</p>\s*<p[^>]*>', re.IGNORECASE)
+_RE_P = re.compile(r'</?p[^>]*>', re.IGNORECASE)
+_RE_A = re.compile(r'<a[^>]+href=["\']([^"\'>]+)["\'][^>]*>([^<]*)</a>', re.IGNORECASE)
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_MULTINL = re.compile(r'\n\s*\n\s*\n+')
+
+# Content types by file extension. Common attachment types are listed up
+# front so the mimetypes database (read from the system mime.types files)
+# is only loaded for unusual extensions; guesses are added as they're made.
+_CONTENT_TYPES: Dict[str, str] = {
+    '.pdf': 'application/pdf',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.txt': 'text/plain',
+    '.csv': 'text/csv',
+    '.html': 'text/html',
+    '.md': 'text/markdown',
+    '.json': 'application/json',
+    '.zip': 'application/zip',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xls': 'application/vnd.ms-excel',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.ppt': 'application/vnd.ms-powerpoint',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    '.ics': 'text/calendar',
+}
+
+# Attachments are base64-encoded in chunks of this many bytes; a multiple
+# of 57 so every chunk encodes to whole 76-character lines
+_ATTACHMENT_CHUNK_SIZE = 57 * 1024
+
+# Read buffer for attachment, body and batch files, so large files are read
+# with a few big syscalls rather than many 8 KiB ones
+_FILE_BUFFER_SIZE = 1 << 20
+
+# Shared Markdown converter (see _get_markdown)
+_MARKDOWN = None
+
 # Configuration management
 class GmailConfig:
     """Configuration management for Gmail CLI."""
@@ -41,14 +205,25 @@ class GmailConfig:
         self.config_dir = Path.home() / '.config' / 'gmail-cli'
         self.default_config_file = self.config_dir / 'config.json'
         self.default_token_file = self.config_dir / 'token.json'
+        self.default_profile_file = self.config_dir / 'profile.json'
         
         # Legacy paths for backward compatibility
         self.legacy_credentials_file = '/Users/stephanfitzpatrick/Downloads/OAuth Client ID Secret (1).json'
         self.legacy_token_file = Path.cwd() / 'gmail_token.json'
         
+        # Names of the files in the config directory, listed once up front so
+        # existence checks don't each need a stat() (None if it doesn't exist)
+        try:
+            with os.scandir(self.config_dir) as entries:
+                self._config_dir_entries = frozenset(entry.name for entry in entries)
+        except OSError:
+            self._config_dir_entries = None
+        
         # Default configuration
         self.defaults = {
             'token_file': str(self.default_token_file),
+            'profile_file': str(self.default_profile_file),
+            'profile_cache_ttl': PROFILE_CACHE_TTL,
             'client_id': None,
             'client_secret': None,
             'config_dir': str(self.config_dir)
@@ -56,8 +231,11 @@ class GmailConfig:
         
     def ensure_config_dir(self) -> None:
         """Create configuration directory if it doesn't exist."""
+        if self._config_dir_entries is not None:
+            return
         try:
             self.config_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+            self._config_dir_entries = frozenset()
         except PermissionError as e:
             raise click.ClickException(
                 f"Cannot create configuration directory {self.config_dir}: {e}"
@@ -67,17 +245,23 @@ class GmailConfig:
                 f"Error creating configuration directory {self.config_dir}: {e}"
             )
     
+    def file_exists(self, path) -> bool:
+        """Check whether a file exists, using the config directory listing if possible."""
+        path = Path(path)
+        if self._config_dir_entries is not None and path.parent == self.config_dir:
+            return path.name in self._config_dir_entries
+        return path.exists()
+    
     def load_config_file(self, config_file: Optional[str] = None) -> Dict[str, Any]:
         """Load configuration from JSON file."""
         config_path = Path(config_file) if config_file else self.default_config_file
         
-        if not config_path.exists():
-            return {}
-        
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            with open(config_path, 'rb') as f:
+                config = _loads(f.read())
                 return config if isinstance(config, dict) else {}
+        except FileNotFoundError:
+            return {}
         except json.JSONDecodeError as e:
             raise click.ClickException(
                 f"Invalid JSON in configuration file {config_path}: {e}"
@@ -95,14 +279,12 @@ class GmailConfig:
                     client_secret: Optional[str] = None) -> Dict[str, Any]:
         """Merge configuration from file, CLI args, and defaults."""
         # Start with defaults
-        config = self.defaults.copy()
+        config = dict(self.defaults)
         
-        # Load from config file (overrides defaults for client_id/secret and token_file only)
+        # Load from config file (overrides defaults for client_id/secret, token_file and profile_cache_ttl only)
         file_config = self.load_config_file(config_file_path)
         # Only allow specific keys from config file (no credentials_file)
-        allowed_config_keys = {'token_file', 'client_id', 'client_secret'}
-        filtered_file_config = {k: v for k, v in file_config.items() if k in allowed_config_keys}
-        config.update(filtered_file_config)
+        config.update((k, file_config[k]) for k in _ALLOWED_CONFIG_KEYS if k in file_config)
         
         # CLI arguments override everything
         if token_file is not None:
@@ -143,169 +325,378 @@ class GmailConfig:
         # If both provided, credentials file takes precedence
         if has_credentials_file and has_client_credentials:
             click.echo("⚠️  Both credentials file and client ID/secret provided. Using credentials file.", err=True)
+        
+        ttl = config.get('profile_cache_ttl')
+        if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl < 0:
+            raise click.ClickException(
+                f"Invalid profile_cache_ttl in config file: {ttl!r} (expected a number of seconds, 0 to disable)"
+            )
     
-    def migrate_legacy_token(self, config: Dict[str, Any]) -> None:
+    def migrate_legacy_token(self, config: Dict[str, Any], assume_yes: bool = False) -> None:
         """Migrate legacy token file to new location if needed."""
-        if self.legacy_token_file.exists() and not Path(config['token_file']).exists():
-            if click.confirm(
-                f"\nFound existing token file at {self.legacy_token_file}.\n"
-                f"Would you like to migrate it to {config['token_file']}?"
-            ):
+        # Check the token first: it is usually answered from the directory
+        # listing, so the common case skips the stat of the legacy path
+        if not self.file_exists(config['token_file']) and self.legacy_token_file.exists():
+            if assume_yes:
+                migrate = True
+            elif sys.stdin.isatty():
+                migrate = click.confirm(
+                    f"\nFound existing token file at {self.legacy_token_file}.\n"
+                    f"Would you like to migrate it to {config['token_file']}?"
+                )
+            else:
+                # Never block scripts and cron jobs on a prompt
+                click.echo(
+                    f"⚠️  Found existing token file at {self.legacy_token_file}; "
+                    f"pass --yes to migrate it to {config['token_file']}",
+                    err=True
+                )
+                migrate = False
+            
+            if migrate:
                 try:
                     self.ensure_config_dir()
                     self.legacy_token_file.rename(config['token_file'])
+                    token_path = Path(config['token_file'])
+                    if token_path.parent == self.config_dir:
+                        self._config_dir_entries |= {token_path.name}
                     click.echo(f"✓ Token file migrated to {config['token_file']}")
                 except Exception as e:
                     click.echo(f"⚠️  Could not migrate token file: {e}", err=True)
                     click.echo(f"   You may need to re-authenticate", err=True)
 
 
+def _token_is_fresh(creds) -> bool:
+    """Check whether credentials are valid and not about to expire."""
+    if not creds or not creds.valid:
+        return False
+    if creds.expiry is None:
+        return True
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now > TOKEN_REFRESH_MARGIN
+
+
 def authenticate_gmail(config: Dict[str, Any]):
     """Authenticate with Gmail API using OAuth2 flow with configurable credentials."""
+    from google.oauth2.credentials import Credentials
+    
     creds = None
     token_file = config['token_file']
     
-    # Load existing token if available
-    if os.path.exists(token_file):
+    # Load existing token if available, reusing credentials already parsed in
+    # this process if the token file is unchanged. The mtime comes from the
+    # open file, so it always matches the contents that were read.
+    cache_key = None
+    try:
+        with open(token_file, 'rb') as f:
+            cache_key = (token_file, os.fstat(f.fileno()).st_mtime)
+            creds = _CREDS_CACHE.get(cache_key)
+            if creds is None:
+                creds = Credentials.from_authorized_user_info(_loads(f.read()), SCOPES)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        click.echo(f"Error loading existing token: {e}", err=True)
+    
+    # Valid token that won't expire soon: no refresh and no rewrite needed
+    if _token_is_fresh(creds):
+        _CREDS_CACHE[cache_key] = creds
+        return creds
+    
+    token_changed = False
+    
+    if creds and creds.refresh_token:
+        # The requests transport (and below, oauthlib) is only imported when a
+        # refresh or login is needed; a fresh token returns before this point
+        from google.auth.transport.requests import Request
+        
         try:
-            creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+            creds.refresh(Request())
+            token_changed = True
+            click.echo("Token refreshed successfully.")
         except Exception as e:
-            click.echo(f"Error loading existing token: {e}", err=True)
+            click.echo(f"Error refreshing token: {e}", err=True)
+            # A still-valid token is usable even if the early refresh failed
+            if not creds.valid:
+                creds = None
     
     # If there are no valid credentials available, let the user log in
     if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-                click.echo("Token refreshed successfully.")
-            except Exception as e:
-                click.echo(f"Error refreshing token: {e}", err=True)
-                creds = None
+        # Create OAuth2 flow based on configuration
+        from google_auth_oauthlib.flow import InstalledAppFlow
         
-        if not creds:
-            # Create OAuth2 flow based on configuration
-            try:
-                if config.get('credentials_file'):
-                    # Use credentials file method
-                    if not os.path.exists(config['credentials_file']):
-                        raise click.ClickException(
-                            f"Credentials file not found at {config['credentials_file']}. "
-                            "Please ensure you have downloaded the OAuth client credentials from Google Cloud Console."
-                        )
-                    flow = InstalledAppFlow.from_client_secrets_file(config['credentials_file'], SCOPES)
-                elif config.get('client_id') and config.get('client_secret'):
-                    # Use client ID/secret method
-                    client_config = {
-                        'installed': {
-                            'client_id': config['client_id'],
-                            'client_secret': config['client_secret'],
-                            'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
-                            'token_uri': 'https://oauth2.googleapis.com/token',
-                            'redirect_uris': ['http://localhost']
-                        }
-                    }
-                    flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
-                else:
+        try:
+            if config.get('credentials_file'):
+                # Use credentials file method
+                if not os.path.exists(config['credentials_file']):
                     raise click.ClickException(
-                        "No valid authentication method configured. Please provide either:\n"
-                        "  1. Credentials file via --credentials-file\n"
-                        "  2. Client ID and secret via --client-id and --client-secret"
+                        f"Credentials file not found at {config['credentials_file']}. "
+                        "Please ensure you have downloaded the OAuth client credentials from Google Cloud Console."
                     )
-                
-                creds = flow.run_local_server(port=0)
-                click.echo("Authentication successful!")
-                
-            except Exception as e:
-                raise click.ClickException(f"Authentication failed: {e}")
-        
-        # Save the credentials for the next run
+                flow = InstalledAppFlow.from_client_secrets_file(config['credentials_file'], SCOPES)
+            elif config.get('client_id') and config.get('client_secret'):
+                # Use client ID/secret method
+                client_config = {
+                    'installed': {
+                        'client_id': config['client_id'],
+                        'client_secret': config['client_secret'],
+                        'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
+                        'token_uri': 'https://oauth2.googleapis.com/token',
+                        'redirect_uris': ['http://localhost']
+                    }
+                }
+                flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
+            else:
+                raise click.ClickException(
+                    "No valid authentication method configured. Please provide either:\n"
+                    "  1. Credentials file via --credentials-file\n"
+                    "  2. Client ID and secret via --client-id and --client-secret"
+                )
+            
+            creds = flow.run_local_server(port=0)
+            token_changed = True
+            click.echo("Authentication successful!")
+            
+        except Exception as e:
+            raise click.ClickException(f"Authentication failed: {e}")
+    
+    # Save the credentials for the next run, only if they changed
+    if token_changed:
         try:
             # Ensure directory exists
             token_path = Path(token_file)
             token_path.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(token_file, 'w') as token:
-                token.write(creds.to_json())
+            # Replace the token in one step so an interrupted run can't truncate it
+            write_file_atomic(token_file, creds.to_json())
+            _CREDS_CACHE[(token_file, os.stat(token_file).st_mtime)] = creds
         except Exception as e:
             click.echo(f"Warning: Could not save token file: {e}", err=True)
     
     return creds
 
 
-def create_message(sender, to, subject, body_html, cc=None, bcc=None, signature=''):
-    """Create an HTML email message."""
-    message = MIMEMultipart()
-    message['to'] = ', '.join(to)
-    message['from'] = sender
-    message['subject'] = subject
-    
-    if cc:
-        message['cc'] = ', '.join(cc)
-    if bcc:
-        message['bcc'] = ', '.join(bcc)
-    
-    # Add signature to body if provided
-    full_body = body_html
-    if signature:
-        full_body = f"{body_html}<br><br>{signature}"
-    
-    # Always send as HTML
-    message.attach(MIMEText(full_body, 'html'))
+def build_service(creds):
+    """Build the Gmail API service, reusing it and its HTTP connection per token."""
+    service = _SERVICE_CACHE.get(creds.token)
+    if service is None:
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build
+        
+        # One authorized transport shared by every call on this service, so
+        # they all go over the same kept-alive TLS connection
+        http = AuthorizedHttp(creds, http=httplib2.Http(cache=None, timeout=HTTP_TIMEOUT))
+        # Use the discovery document bundled with the client library and skip
+        # probing for a discovery cache backend
+        service = build('gmail', 'v1', http=http, cache_discovery=False, static_discovery=True)
+        _SERVICE_CACHE[creds.token] = service
+    return service
+
+
+def get_service(config: Dict[str, Any]):
+    """Authenticate and return (credentials, service), reusing both within a process."""
+    creds = authenticate_gmail(config)
+    return creds, build_service(creds)
+
+
+def guess_content_type(file_path):
+    """Guess an attachment's content type from its file extension."""
+    extension = os.path.splitext(file_path)[1].lower()
+    content_type = _CONTENT_TYPES.get(extension)
+    if content_type is None:
+        content_type, encoding = mimetypes.guess_type('attachment' + extension)
+        
+        if content_type is None or encoding is not None:
+            content_type = 'application/octet-stream'
+        
+        _CONTENT_TYPES[extension] = content_type
+    return content_type
+
+
+def create_attachment_part(file_path):
+    """Create a base64-encoded MIME part for a file, encoding it in chunks."""
+    content_type = guess_content_type(file_path)
+    main_type, sub_type = content_type.split('/', 1)
     
-    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+    # Encode straight from the file instead of holding the raw bytes and
+    # letting encoders.encode_base64 re-scan them
+    try:
+        with open(file_path, 'rb', buffering=_FILE_BUFFER_SIZE) as fp:
+            payload = ''.join(
+                base64.encodebytes(chunk).decode('ascii')
+                for chunk in iter(lambda: fp.read(_ATTACHMENT_CHUNK_SIZE), b'')
+            )
+    except (FileNotFoundError, IsADirectoryError):
+        raise click.ClickException(f"Attachment file not found: {file_path}")
+    
+    attachment = MIMEPart(policy=MESSAGE_POLICY)
+    attachment['Content-Type'] = content_type
+    attachment['Content-Transfer-Encoding'] = 'base64'
+    attachment.add_header(
+        'Content-Disposition', 'attachment', filename=Path(file_path).name
+    )
+    attachment.set_payload(payload.rstrip('\n'))
+    return attachment
 
 
-def create_message_with_attachment(sender, to, subject, body_html, 
-                                 cc=None, bcc=None, attachments=None, signature=''):
-    """Create an HTML email message with attachments."""
-    message = MIMEMultipart()
-    message['to'] = ', '.join(to)
+def serialize_message(message) -> bytes:
+    """Serialize a MIME message to RFC 5322 bytes."""
+    buf = io.BytesIO()
+    BytesGenerator(buf).flatten(message)
+    return buf.getvalue()
+
+
+def build_base_message(sender, subject, body_html, signature='', attachments=None):
+    """Build an HTML email message without its recipient headers."""
+    message = EmailMessage(policy=MESSAGE_POLICY)
     message['from'] = sender
     message['subject'] = subject
     
-    if cc:
-        message['cc'] = ', '.join(cc)
-    if bcc:
-        message['bcc'] = ', '.join(bcc)
-    
     # Add signature to body if provided
     full_body = body_html
     if signature:
         full_body = f"{body_html}<br><br>{signature}"
     
     # Always send as HTML
-    message.attach(MIMEText(full_body, 'html'))
+    message.set_content(full_body, subtype='html')
     
     # Add attachments
     if attachments:
+        message.make_mixed()
         for file_path in attachments:
-            if not os.path.isfile(file_path):
-                raise click.ClickException(f"Attachment file not found: {file_path}")
-            
-            content_type, encoding = mimetypes.guess_type(file_path)
-            
-            if content_type is None or encoding is not None:
-                content_type = 'application/octet-stream'
-            
-            main_type, sub_type = content_type.split('/', 1)
-            
-            with open(file_path, 'rb') as fp:
-                attachment = MIMEBase(main_type, sub_type)
-                attachment.set_payload(fp.read())
-                encoders.encode_base64(attachment)
-                attachment.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename="{Path(file_path).name}"'
-                )
-                message.attach(attachment)
+            message.attach(create_attachment_part(file_path))
+    
+    return message
+
+
+@lru_cache(maxsize=1024)
+def parse_addresses(value):
+    """Parse a recipient string into Address objects, caching repeated recipients."""
+    try:
+        # getaddresses yields ('', '') for empty items such as a trailing ", "
+        addresses = tuple(
+            Address(display_name=name, addr_spec=addr)
+            for name, addr in email.utils.getaddresses([value])
+            if addr
+        )
+    except Exception:
+        raise click.ClickException(f"Invalid email address: {value}")
+    if not addresses:
+        raise click.ClickException(f"Invalid email address: {value}")
+    return addresses
+
+
+def add_recipient_headers(base_bytes, to, cc=None, bcc=None):
+    """Prepend recipient headers to a serialized base message.
+    
+    Only the recipient headers are serialized here, so one base message can
+    be reused for many recipients without re-serializing its body. to, cc
+    and bcc may be any iterables of address strings, such as click's tuples.
+    """
+    recipients = [('to', to), ('cc', cc), ('bcc', bcc)]
+    headers = []
+    for name, values in recipients:
+        if not values:
+            continue
+        # Structured addresses are folded directly, without re-parsing a joined string
+        addresses = [address for value in values for address in parse_addresses(value)]
+        header = SMTP.header_factory(name, addresses)
+        headers.append(header.fold(policy=SMTP).encode('ascii'))
+    headers.append(base_bytes)
+    return b''.join(headers)
+
+
+def finalize_message(base_bytes, to, cc=None, bcc=None):
+    """Build a base64url-encoded message resource for batched requests.
+    
+    Batch requests cannot carry media uploads, so the message has to travel
+    base64-encoded in the request body.
+    """
+    raw_bytes = add_recipient_headers(base_bytes, to, cc, bcc)
+    return {'raw': base64.urlsafe_b64encode(raw_bytes).decode()}
+
+
+def media_request_args(message):
+    """Split a message into request metadata and an RFC 822 media upload.
+    
+    The message bytes are uploaded as-is, avoiding the extra base64 pass
+    that the 'raw' body field requires.
+    """
+    from googleapiclient.http import MediaInMemoryUpload
     
-    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+    metadata = {key: value for key, value in message.items() if key != 'raw'}
+    media = MediaInMemoryUpload(message['raw'], mimetype='message/rfc822')
+    return metadata, media
+
+
+def create_message(sender, to, subject, body_html, cc=None, bcc=None, signature=''):
+    """Create an HTML email message."""
+    base_message = build_base_message(sender, subject, body_html, signature)
+    return {'raw': add_recipient_headers(serialize_message(base_message), to, cc, bcc)}
+
+
+def create_message_with_attachment(sender, to, subject, body_html, 
+                                 cc=None, bcc=None, attachments=None, signature=''):
+    """Create an HTML email message with attachments."""
+    base_message = build_base_message(sender, subject, body_html, signature, attachments)
+    return {'raw': add_recipient_headers(serialize_message(base_message), to, cc, bcc)}
+
+
+def _retry_after_seconds(error) -> Optional[float]:
+    """Parse the Retry-After header of an HttpError, if present."""
+    value = error.resp.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(error, attempt, base=1.0, cap=30.0) -> float:
+    """Seconds to wait before retry number attempt + 1 after error."""
+    # Prefer the server's Retry-After; otherwise use full jitter
+    delay = _retry_after_seconds(error)
+    if delay is None:
+        delay = random.uniform(0, base * 2 ** attempt)
+    return min(delay, cap)
+
+
+def _retry(fn, *args, max_attempts=5, base=1.0, cap=30.0, statuses=RETRYABLE_STATUSES, **kwargs):
+    """Call fn, retrying rate-limit and server errors with exponential backoff.
+    
+    Pass statuses=SAFE_RETRY_STATUSES for calls that are not idempotent.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return fn(*args, **kwargs)
+        except HttpError as error:
+            # BatchError is an HttpError raised without a response
+            status = getattr(error.resp, 'status', None)
+            if status not in statuses or attempt == max_attempts - 1:
+                raise
+            delay = _backoff_delay(error, attempt, base, cap)
+            click.echo(
+                f"Gmail API returned {status}, retrying in {delay:.1f}s "
+                f"(attempt {attempt + 2}/{max_attempts})...",
+                err=True
+            )
+            time.sleep(delay)
 
 
 def send_message(service, user_id, message):
     """Send an email message."""
     try:
-        message = service.users().messages().send(userId=user_id, body=message).execute()
+        metadata, media = media_request_args(message)
+        message = _retry(service.users().messages().send(
+            userId=user_id, body=metadata, media_body=media, fields=MESSAGE_FIELDS
+        ).execute, statuses=SAFE_RETRY_STATUSES)
         return message
     except HttpError as error:
         if error.resp.status == 403:
@@ -322,21 +713,26 @@ def send_message(service, user_id, message):
 
 def get_sender_email(service):
     """Get the authenticated user's email address."""
+    # Remembered on the service, which is itself cached per token
+    sender_email = getattr(service, '_sender_email', None)
+    if sender_email:
+        return sender_email
     try:
-        profile = service.users().getProfile(userId='me').execute()
-        return profile['emailAddress']
+        profile = _retry(service.users().getProfile(userId='me', fields='emailAddress').execute)
+        service._sender_email = profile['emailAddress']
+        return service._sender_email
     except HttpError as error:
         raise click.ClickException(f"Could not retrieve sender email: {error}")
 
 
-def convert_to_html(content, input_format):
-    """Convert content to HTML based on input format with enhanced formatting."""
-    if input_format == 'html':
-        return content
-    elif input_format == 'markdown':
+def _get_markdown():
+    """Return the shared Markdown converter, building it on first use."""
+    global _MARKDOWN
+    if _MARKDOWN is None:
+        import markdown
+        
         # Use markdown extensions for better code formatting
-        html = markdown.markdown(
-            content,
+        _MARKDOWN = markdown.Markdown(
             extensions=[
                 'codehilite',  # Syntax highlighting
                 'fenced_code', # Better fenced code block support
@@ -353,89 +749,54 @@ def convert_to_html(content, input_format):
                 }
             }
         )
+    return _MARKDOWN
+
+
+@lru_cache(maxsize=128)
+def convert_to_html(content, input_format):
+    """Convert content to HTML based on input format with enhanced formatting.
+    
+    Results are cached, so batch entries that share a body are rendered once.
+    """
+    if input_format == 'html':
+        return content
+    elif input_format == 'markdown':
+        html = _get_markdown().reset().convert(content)
         # Add custom CSS for better email formatting
-        css_styles = """
-        <style>
-        /* Code block styling */
-        .highlight {
-            background: #f6f8fa !important;
-            border: 1px solid #d1d9e0 !important;
-            border-radius: 6px !important;
-            padding: 16px !important;
-            margin: 16px 0 !important;
-            overflow-x: auto !important;
-            font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace !important;
-            font-size: 14px !important;
-            line-height: 1.45 !important;
-        }
-        /* Inline code styling */
-        code {
-            background: #f6f8fa !important;
-            padding: 2px 4px !important;
-            border-radius: 3px !important;
-            font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace !important;
-            font-size: 85% !important;
-            color: #d73a49 !important;
-        }
-        /* Don't style code inside pre blocks */
-        pre code {
-            background: transparent !important;
-            padding: 0 !important;
-            border-radius: 0 !important;
-            color: inherit !important;
-        }
-        /* Table styling */
-        table {
-            border-collapse: collapse !important;
-            width: 100% !important;
-            margin: 16px 0 !important;
-        }
-        th, td {
-            border: 1px solid #d1d9e0 !important;
-            padding: 8px 12px !important;
-            text-align: left !important;
-        }
-        th {
-            background: #f6f8fa !important;
-            font-weight: bold !important;
-        }
-        /* Blockquote styling */
-        blockquote {
-            border-left: 4px solid #d1d9e0 !important;
-            padding: 0 16px !important;
-            margin: 16px 0 !important;
-            color: #6a737d !important;
-        }
-        </style>
-        """
-        return css_styles + html
+        return ''.join((_CSS_STYLES, html))
     elif input_format == 'plaintext':
         # Convert plain text to HTML, preserving line breaks
-        html_content = content.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-        html_content = html_content.replace('\n', '<br>\n')
-        return html_content
+        return escape(content, quote=False).replace('\n', '<br>\n')
     else:
         raise ValueError(f"Unsupported input format: {input_format}")
 
 
 def html_to_plain_text(html):
-    """Convert HTML signature to plain text."""
+    """Convert HTML signature to plain text.
+    
+    Not called when building messages: every body, plaintext input
+    included, is sent as HTML with the signature left as HTML.
+    """
     if not html:
         return ''
     
+    # Nothing to strip from signatures that are already plain text
+    if '<' not in html:
+        return _RE_MULTINL.sub('\n\n', html).strip()
+    
     # Remove HTML tags but preserve structure
     text = html
     
     # Convert <br> and <br/> tags to newlines
-    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
+    text = _RE_BR.sub('\n', text)
     
     # Convert <div> tags to newlines (Gmail uses divs for line breaks)
-    text = re.sub(r'</div>\s*<div[^>]*>', '\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'</?div[^>]*>', '', text, flags=re.IGNORECASE)
+    text = _RE_DIV_BETWEEN.sub('\n', text)
+    text = _RE_DIV.sub('', text)
     
     # Convert <p> tags to double newlines
-    text = re.sub(r'</p>\s*<p[^>]*>', '\n\n', text, flags=re.IGNORECASE)
-    text = re.sub(r'</?p[^>]*>', '', text, flags=re.IGNORECASE)
+    text = _RE_P_BETWEEN.sub('\n\n', text)
+    text = _RE_P.sub('', text)
     
     # Extract URLs from <a> tags and format as "text (url)"
     def replace_links(match):
@@ -445,43 +806,166 @@ def html_to_plain_text(html):
             return href
         return f"{link_text} ({href})"
     
-    text = re.sub(r'<a[^>]+href=["\']([^"\'>]+)["\'][^>]*>([^<]*)</a>', replace_links, text, flags=re.IGNORECASE)
+    text = _RE_A.sub(replace_links, text)
     
     # Remove all other HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _RE_TAG.sub('', text)
     
     # Clean up whitespace
-    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # Multiple newlines to double
-    text = re.sub(r'^\s+|\s+$', '', text)  # Trim whitespace
+    text = _RE_MULTINL.sub('\n\n', text)  # Multiple newlines to double
+    return text.strip()
+
+
+def send_as_list_request(service):
+    """Build the sendAs.list request used to look up the signature."""
+    return service.users().settings().sendAs().list(
+        userId='me', fields='sendAs(isPrimary,signature)'
+    )
+
+
+def primary_signature(send_as_list):
+    """Return the signature of the primary send-as address."""
+    for send_as in send_as_list.get('sendAs', []):
+        if send_as.get('isPrimary', False):
+            return send_as.get('signature', '')
     
-    return text
+    # If no primary found, return empty signature
+    return ''
+
 
+def fetch_gmail_signature(service):
+    """Fetch the user's default Gmail signature, raising HttpError on failure."""
+    # Get the primary send-as address (which contains the signature)
+    return primary_signature(_retry(send_as_list_request(service).execute))
 
-def get_gmail_signature(service):
-    """Get the user's default Gmail signature."""
+
+def _token_fingerprint(creds):
+    """Identify the current authorization so a re-auth invalidates cached data."""
+    secret = creds.refresh_token or creds.token or ''
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()
+
+
+def load_cached_profile(config: Dict[str, Any], creds) -> Dict[str, Any]:
+    """Load the cached sender email and signature if they are still fresh."""
     try:
-        # Get the primary send-as address (which contains the signature)
-        send_as_list = service.users().settings().sendAs().list(userId='me').execute()
-        
-        for send_as in send_as_list.get('sendAs', []):
-            if send_as.get('isPrimary', False):
-                signature = send_as.get('signature', '')
-                return signature
-        
-        # If no primary found, return empty signature
-        return ''
-    except HttpError as error:
-        click.echo(f"Warning: Could not retrieve Gmail signature: {error}", err=True)
-        return ''
+        with open(config['profile_file'], 'rb') as f:
+            profile = _loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    
+    if not isinstance(profile, dict):
+        return {}
+    if profile.get('token') != _token_fingerprint(creds):
+        return {}
+    if time.time() - profile.get('cached_at', 0) >= config.get('profile_cache_ttl', PROFILE_CACHE_TTL):
+        return {}
+    return profile
+
+
+def write_file_atomic(path, data: str) -> None:
+    """Write text to path through a temporary file and os.replace.
+    
+    Readers see either the old or the new contents, never a partial file,
+    even if the process is interrupted mid-write. Each write uses its own
+    temporary file, so concurrent runs can't clobber each other's.
+    
+    New files are created private (0600); an existing file keeps its mode,
+    as it would when overwritten in place.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        # os.chmod rather than os.fchmod, which Windows lacks before 3.13
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def save_cached_profile(config: Dict[str, Any], profile: Dict[str, Any]) -> None:
+    """Save the sender email and signature for later invocations."""
+    try:
+        write_file_atomic(config['profile_file'], _dumps(profile))
+    except Exception as e:
+        click.echo(f"Warning: Could not save profile cache: {e}", err=True)
+
+
+def fetch_profile_batch(service) -> Dict[str, Any]:
+    """Fetch the sender email and signature in one batched HTTP request.
+    
+    Returns only the values whose lookups succeeded, so callers can fall
+    back to individual (retried) requests for the rest.
+    """
+    responses = {}
+    
+    def on_response(request_id, response, exception):
+        if exception is None:
+            responses[request_id] = response
+    
+    batch = service.new_batch_http_request(callback=on_response)
+    batch.add(service.users().getProfile(userId='me', fields='emailAddress'), request_id='profile')
+    batch.add(send_as_list_request(service), request_id='sendAs')
+    try:
+        _retry(batch.execute)
+    except HttpError:
+        return {}
+    
+    profile = {}
+    if 'profile' in responses:
+        profile['emailAddress'] = service._sender_email = responses['profile']['emailAddress']
+    if 'sendAs' in responses:
+        profile['signature'] = primary_signature(responses['sendAs'])
+    return profile
+
+
+def get_sender_profile(service, creds, config: Dict[str, Any],
+                       need_email=True, need_signature=True, refresh=False):
+    """Get the sender email and Gmail signature, reusing cached values when fresh."""
+    cached = {} if refresh else load_cached_profile(config, creds)
+    profile = dict(cached)
+    
+    # Both lookups needed: one batched round trip instead of two
+    if need_email and need_signature and not profile.keys() & {'emailAddress', 'signature'}:
+        profile.update(fetch_profile_batch(service))
+    
+    if need_email and 'emailAddress' not in profile:
+        profile['emailAddress'] = get_sender_email(service)
+    
+    if need_signature and 'signature' not in profile:
+        try:
+            profile['signature'] = fetch_gmail_signature(service)
+        except HttpError as error:
+            # Don't cache a failed lookup as an empty signature
+            click.echo(f"Warning: Could not retrieve Gmail signature: {error}", err=True)
+    
+    if profile != cached:
+        profile.setdefault('token', _token_fingerprint(creds))
+        profile.setdefault('cached_at', time.time())
+        save_cached_profile(config, profile)
+    
+    signature = profile.get('signature', '') if need_signature else ''
+    return profile.get('emailAddress'), signature
 
 
 def create_draft(service, user_id, message):
     """Create a draft email."""
     try:
-        draft = service.users().drafts().create(
+        metadata, media = media_request_args(message)
+        draft = _retry(service.users().drafts().create(
             userId=user_id, 
-            body={'message': message}
-        ).execute()
+            body={'message': metadata},
+            media_body=media,
+            fields=DRAFT_FIELDS
+        ).execute, statuses=SAFE_RETRY_STATUSES)
         return draft
     except HttpError as error:
         if error.resp.status == 403:
@@ -496,14 +980,71 @@ def create_draft(service, user_id, message):
             raise click.ClickException(f"Gmail API error: {error}")
 
 
+def create_drafts_batch(service, user_id, messages, max_attempts=5, base=1.0, cap=30.0):
+    """Create drafts in batched HTTP requests.
+    
+    Drafts rejected with a retryable status (rate limiting) are re-batched
+    with the same backoff as _retry. Returns a list of (draft, error) tuples
+    in the same order as messages.
+    """
+    results = [(None, None)] * len(messages)
+    pending = list(range(len(messages)))
+    
+    for attempt in range(max_attempts):
+        retryable = []
+        
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            results[index] = (response, exception)
+            status = getattr(getattr(exception, 'resp', None), 'status', None)
+            if isinstance(exception, HttpError) and status in SAFE_RETRY_STATUSES:
+                retryable.append((index, exception))
+        
+        for start in range(0, len(pending), BATCH_SIZE):
+            group = pending[start:start + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=on_response)
+            for index in group:
+                batch.add(
+                    service.users().drafts().create(
+                        userId=user_id,
+                        body={'message': messages[index]},
+                        fields=DRAFT_FIELDS
+                    ),
+                    request_id=str(index)
+                )
+            try:
+                _retry(batch.execute, max_attempts=max_attempts, base=base, cap=cap,
+                       statuses=SAFE_RETRY_STATUSES)
+            except (HttpError, OSError) as error:
+                # The whole group failed; report it against each of its drafts
+                # and carry on, so drafts created by other groups are still listed
+                for index in group:
+                    results[index] = (None, error)
+        
+        if not retryable or attempt == max_attempts - 1:
+            break
+        
+        delay = max(_backoff_delay(error, attempt, base, cap) for _, error in retryable)
+        click.echo(
+            f"Gmail API rate-limited {len(retryable)} draft(s), retrying in {delay:.1f}s "
+            f"(attempt {attempt + 2}/{max_attempts})...",
+            err=True
+        )
+        time.sleep(delay)
+        pending = sorted(index for index, _ in retryable)
+    
+    return results
+
+
 def get_message_details(service, message_id):
     """Retrieve message details including headers and thread ID."""
     try:
-        message = service.users().messages().get(
+        message = _retry(service.users().messages().get(
             userId='me',
             id=message_id,
-            format='full'
-        ).execute()
+            format='full',
+            fields=REPLY_SOURCE_FIELDS
+        ).execute)
         return message
     except HttpError as error:
         if error.resp.status == 404:
@@ -515,10 +1056,11 @@ def get_message_details(service, message_id):
 def get_thread_details(service, thread_id):
     """Retrieve full thread context."""
     try:
-        thread = service.users().threads().get(
+        thread = _retry(service.users().threads().get(
             userId='me',
-            id=thread_id
-        ).execute()
+            id=thread_id,
+            fields=f'messages({REPLY_SOURCE_FIELDS})'
+        ).execute)
         return thread
     except HttpError as error:
         if error.resp.status == 404:
@@ -684,7 +1226,7 @@ def create_reply_message(original_msg, sender, body_html,
     # Extract original message details
     original_headers = extract_reply_headers(original_msg)
     
-    message = MIMEMultipart()
+    message = EmailMessage(policy=MESSAGE_POLICY)
     
     # Set threading headers
     if 'message-id' in original_headers:
@@ -729,10 +1271,10 @@ def create_reply_message(original_msg, sender, body_html,
     else:
         full_body = f"{body_html}{signature}"
     
-    message.attach(MIMEText(full_body, 'html'))
+    message.set_content(full_body, subtype='html')
     
     raw_message = {
-        'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()
+        'raw': serialize_message(message)
     }
     
     # Preserve thread ID
@@ -752,7 +1294,7 @@ def create_reply_message_with_attachment(original_msg, sender, body_html,
     # Extract original message details
     original_headers = extract_reply_headers(original_msg)
     
-    message = MIMEMultipart()
+    message = EmailMessage(policy=MESSAGE_POLICY)
     
     # Set threading headers
     if 'message-id' in original_headers:
@@ -797,33 +1339,16 @@ def create_reply_message_with_attachment(original_msg, sender, body_html,
     else:
         full_body = f"{body_html}{signature}"
     
-    message.attach(MIMEText(full_body, 'html'))
+    message.set_content(full_body, subtype='html')
     
     # Add attachments
     if attachments:
+        message.make_mixed()
         for file_path in attachments:
-            if not os.path.isfile(file_path):
-                raise click.ClickException(f"Attachment file not found: {file_path}")
-            
-            content_type, encoding = mimetypes.guess_type(file_path)
-            
-            if content_type is None or encoding is not None:
-                content_type = 'application/octet-stream'
-            
-            main_type, sub_type = content_type.split('/', 1)
-            
-            with open(file_path, 'rb') as fp:
-                attachment = MIMEBase(main_type, sub_type)
-                attachment.set_payload(fp.read())
-                encoders.encode_base64(attachment)
-                attachment.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename="{Path(file_path).name}"'
-                )
-                message.attach(attachment)
+            message.attach(create_attachment_part(file_path))
     
     raw_message = {
-        'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()
+        'raw': serialize_message(message)
     }
     
     # Preserve thread ID
@@ -844,35 +1369,103 @@ def create_reply_message_with_attachment(original_msg, sender, body_html,
 
 
 
-# Configuration options shared by all commands
-def add_config_options(func):
-    """Add common configuration options to a command."""
-    func = click.option('--config-file', type=click.Path(),
-                       help='Path to configuration JSON file with client_id/secret/token_file (default: ~/.config/gmail-cli/config.json)')(func)
-    func = click.option('--client-secret', 
-                       help='OAuth2 client secret (can be set via CLI or config file)')(func)
-    func = click.option('--client-id', 
-                       help='OAuth2 client ID (can be set via CLI or config file)')(func)
-    func = click.option('--token-file', type=click.Path(),
-                       help='Path to store/read OAuth2 token (default: ~/.config/gmail-cli/token.json)')(func)
-    func = click.option('--credentials-file', type=click.Path(exists=True),
-                       help='Path to OAuth2 credentials JSON file (CLI only, not supported in config file)')(func)
-    return func
+def load_batch_file(batch_file):
+    """Load draft definitions from a JSON Lines file."""
+    entries = []
+    try:
+        with open(batch_file, 'r', encoding='utf-8', buffering=_FILE_BUFFER_SIZE) as f:
+            lines = f.readlines()
+    except Exception as e:
+        raise click.ClickException(f"Error reading batch file: {e}")
+    
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = _loads(line)
+        except json.JSONDecodeError as e:
+            raise click.ClickException(f"Invalid JSON on line {line_number} of {batch_file}: {e}")
+        if not isinstance(entry, dict):
+            raise click.ClickException(f"Line {line_number} of {batch_file} must be a JSON object")
+        
+        # Recipients may be given as a single address or a list of addresses
+        for key in ('to', 'cc', 'bcc', 'attachments'):
+            if isinstance(entry.get(key), str):
+                entry[key] = [entry[key]]
+        
+        missing = [key for key in ('to', 'subject', 'body') if not entry.get(key)]
+        if missing:
+            raise click.ClickException(
+                f"Line {line_number} of {batch_file} is missing: {', '.join(missing)}"
+            )
+        
+        for key in ('to', 'cc', 'bcc', 'attachments'):
+            value = entry.get(key)
+            if value is not None and not (
+                isinstance(value, list) and all(isinstance(item, str) for item in value)
+            ):
+                raise click.ClickException(
+                    f"Line {line_number} of {batch_file}: '{key}' must be a string or a list of strings"
+                )
+        for key in ('subject', 'body'):
+            if not isinstance(entry[key], str):
+                raise click.ClickException(
+                    f"Line {line_number} of {batch_file}: '{key}' must be a string"
+                )
+        if 'input_format' in entry and entry['input_format'] not in INPUT_FORMATS:
+            raise click.ClickException(
+                f"Line {line_number} of {batch_file}: 'input_format' must be one of "
+                f"{', '.join(INPUT_FORMATS)}"
+            )
+        entries.append(entry)
+    
+    if not entries:
+        raise click.ClickException(f"No drafts found in batch file {batch_file}")
+    return entries
 
 
-@click.group()
-def cli():
-    """Gmail CLI - Send emails and manage drafts via Gmail API."""
-    pass
+def create_batch_drafts(service, sender, signature, input_format, entries):
+    """Create one draft per batch file entry and report the results."""
+    click.echo(f"Building {len(entries)} draft(s)...")
+    messages = []
+    # Entries that share subject, body and attachments reuse one serialized
+    # base message; only their recipient headers are built per entry
+    base_messages = {}
+    for entry in entries:
+        body_html = convert_to_html(entry['body'], entry.get('input_format', input_format))
+        attachments = tuple(entry.get('attachments') or ())
+        key = (entry['subject'], body_html, attachments)
+        if key not in base_messages:
+            base_messages[key] = serialize_message(build_base_message(
+                sender, entry['subject'], body_html, signature, attachments
+            ))
+        messages.append(finalize_message(
+            base_messages[key], entry['to'], entry.get('cc'), entry.get('bcc')
+        ))
+    
+    click.echo("Creating drafts...")
+    failed = 0
+    for entry, (draft, error) in zip(entries, create_drafts_batch(service, 'me', messages)):
+        if error is not None:
+            failed += 1
+            click.echo(f"✗ {entry['subject']}: {error}", err=True)
+        else:
+            click.echo(f"✓ Draft ID: {draft['id']}  Subject: {entry['subject']}  To: {', '.join(entry['to'])}")
+    
+    if failed:
+        raise click.ClickException(f"{failed} of {len(entries)} draft(s) could not be created")
+    click.echo(f"\n✓ {len(entries)} draft(s) created successfully!")
 
 
-@cli.command()
-@click.option('--draft-id', required=True, help='Draft ID to send')
-@add_config_options
-def send(draft_id, credentials_file, token_file, client_id, client_secret, config_file):
-    """Send an existing draft."""
-    
-    # Initialize configuration system
+@lru_cache(maxsize=8)
+def _load_config(config_file, credentials_file, token_file, client_id, client_secret,
+                 assume_yes=False) -> Dict[str, Any]:
+    """Resolve, validate and return the configuration for a command.
+    
+    Results are cached per set of arguments, so repeated commands in one
+    process don't re-read the config file. Callers must not modify the
+    returned dict.
+    """
     gmail_config = GmailConfig()
     
     try:
@@ -892,31 +1485,83 @@ def send(draft_id, credentials_file, token_file, client_id, client_secret, confi
         gmail_config.validate_config(config)
         
         # Handle legacy token migration
-        gmail_config.migrate_legacy_token(config)
+        gmail_config.migrate_legacy_token(config, assume_yes)
         
     except click.ClickException:
         raise
     except Exception as e:
         raise click.ClickException(f"Configuration error: {e}")
     
+    return config
+
+
+# Configuration options shared by all commands
+def add_config_options(func):
+    """Add common configuration options to a command."""
+    func = click.option('--config-file', type=click.Path(),
+                       help='Path to configuration JSON file with client_id/secret/token_file/profile_cache_ttl (default: ~/.config/gmail-cli/config.json)')(func)
+    func = click.option('--client-secret', 
+                       help='OAuth2 client secret (can be set via CLI or config file)')(func)
+    func = click.option('--client-id', 
+                       help='OAuth2 client ID (can be set via CLI or config file)')(func)
+    func = click.option('--token-file', type=click.Path(),
+                       help='Path to store/read OAuth2 token (default: ~/.config/gmail-cli/token.json)')(func)
+    func = click.option('--credentials-file', type=click.Path(exists=True),
+                       help='Path to OAuth2 credentials JSON file (CLI only, not supported in config file)')(func)
+    func = click.option('--yes', '-y', 'assume_yes', is_flag=True, envvar='GMAIL_CLI_ASSUME_YES',
+                       help='Answer yes to prompts; without a terminal, prompts default to no')(func)
+    return func
+
+
+@click.group(context_settings={'help_option_names': ['-h', '--help']})
+@click.version_option(package_name='gmail-cli')
+def cli():
+    """Gmail CLI - Send emails and manage drafts via Gmail API."""
+    pass
+
+
+@cli.command()
+@click.option('--draft-id', required=True, help='Draft ID to send')
+@add_config_options
+def send(draft_id, assume_yes, credentials_file, token_file, client_id, client_secret, config_file):
+    """Send an existing draft."""
+    
+    # Initialize configuration system
+    config = _load_config(config_file, credentials_file, token_file,
+                          client_id, client_secret, assume_yes)
+    
     try:
         # Authenticate and build service
         click.echo("\nAuthenticating with Gmail...")
-        creds = authenticate_gmail(config)
-        service = build('gmail', 'v1', credentials=creds)
+        creds, service = get_service(config)
         
         click.echo(f"Sending draft {draft_id}...")
         
         # Send the draft using Gmail API
-        result = service.users().drafts().send(
+        request = service.users().drafts().send(
             userId='me',
-            body={'id': draft_id}
-        ).execute()
+            body={'id': draft_id},
+            fields=MESSAGE_FIELDS
+        )
+        attempts = 0
+        
+        def send_draft():
+            nonlocal attempts
+            attempts += 1
+            return request.execute()
+        
+        result = _retry(send_draft, statuses=SAFE_RETRY_STATUSES)
         
         click.echo(f"✓ Draft sent successfully! Message ID: {result['id']}")
         
     except HttpError as error:
-        if error.resp.status == 404:
+        if error.resp.status == 404 and attempts > 1:
+            # An earlier attempt may have sent the draft before failing
+            raise click.ClickException(
+                f"Draft {draft_id} was not found after a retry; it may already "
+                "have been sent. Check your Sent folder before trying again."
+            )
+        elif error.resp.status == 404:
             raise click.ClickException(f"Draft not found: {draft_id}")
         elif error.resp.status == 403:
             raise click.ClickException(
@@ -935,13 +1580,13 @@ def send(draft_id, credentials_file, token_file, client_id, client_secret, confi
 
 
 @cli.command()
-@click.option('--to', multiple=True, required=True, 
+@click.option('--to', multiple=True, 
               help='Recipient email addresses (can be used multiple times)')
-@click.option('--subject', required=True, help='Email subject')
+@click.option('--subject', help='Email subject')
 @click.option('--body', help='Email body text')
 @click.option('--body-file', type=click.Path(exists=True), 
               help='Read email body from file')
-@click.option('--input-format', type=click.Choice(['markdown', 'html', 'plaintext']), 
+@click.option('--input-format', type=click.Choice(INPUT_FORMATS), 
               default='markdown', help='Input format for email body (default: markdown)')
 @click.option('--cc', multiple=True, help='CC email addresses')
 @click.option('--bcc', multiple=True, help='BCC email addresses')
@@ -950,49 +1595,49 @@ def send(draft_id, credentials_file, token_file, client_id, client_secret, confi
 @click.option('--sender', help='Override sender email (if permitted)')
 @click.option('--signature/--no-signature', default=True, 
               help='Include Gmail default signature (default: enabled)')
+@click.option('--refresh-profile', is_flag=True,
+              help='Re-fetch sender email and signature instead of using the cached copy')
+@click.option('--batch-file', type=click.Path(exists=True),
+              help='Create one draft per line of a JSON Lines file with to/subject/body '
+                   '(and optional cc/bcc/attachments/input_format)')
 @add_config_options
 def draft(to, subject, body, body_file, input_format, cc, bcc, attachment, sender, signature,
-          credentials_file, token_file, client_id, client_secret, config_file):
+          refresh_profile, batch_file, assume_yes, credentials_file, token_file, client_id,
+          client_secret, config_file):
     """Create a draft email."""
     
-    # Initialize configuration system
-    gmail_config = GmailConfig()
-    
-    try:
-        # Ensure config directory exists
-        gmail_config.ensure_config_dir()
-        
-        # Merge configuration from file, CLI args, and defaults
-        config = gmail_config.merge_config(
-            config_file_path=config_file,
-            credentials_file=credentials_file,
-            token_file=token_file,
-            client_id=client_id,
-            client_secret=client_secret
-        )
+    # Validate option combinations before touching configuration, so usage
+    # errors are reported as such (exit code 2) and never wait on a prompt
+    if batch_file:
+        if to or subject or body or body_file or cc or bcc or attachment:
+            raise click.UsageError(
+                "--batch-file cannot be combined with --to, --subject, --body, "
+                "--body-file, --cc, --bcc or --attachment"
+            )
+    else:
+        if not to:
+            raise click.MissingParameter(param_hint="'--to'", param_type='option')
         
-        # Validate configuration
-        gmail_config.validate_config(config)
+        if not subject:
+            raise click.MissingParameter(param_hint="'--subject'", param_type='option')
         
-        # Handle legacy token migration
-        gmail_config.migrate_legacy_token(config)
+        if not body and not body_file:
+            raise click.ClickException("Either --body or --body-file must be provided")
         
-    except click.ClickException:
-        raise
-    except Exception as e:
-        raise click.ClickException(f"Configuration error: {e}")
+        if body and body_file:
+            raise click.ClickException("Cannot specify both --body and --body-file")
     
-    # Validate input
-    if not body and not body_file:
-        raise click.ClickException("Either --body or --body-file must be provided")
+    # Initialize configuration system
+    config = _load_config(config_file, credentials_file, token_file,
+                          client_id, client_secret, assume_yes)
     
-    if body and body_file:
-        raise click.ClickException("Cannot specify both --body and --body-file")
+    if batch_file:
+        entries = load_batch_file(batch_file)
     
     # Read body from file if specified
     if body_file:
         try:
-            with open(body_file, 'r', encoding='utf-8') as f:
+            with open(body_file, 'r', encoding='utf-8', buffering=_FILE_BUFFER_SIZE) as f:
                 body = f.read()
         except Exception as e:
             raise click.ClickException(f"Error reading body file: {e}")
@@ -1000,24 +1645,42 @@ def draft(to, subject, body, body_file, input_format, cc, bcc, attachment, sende
     try:
         # Authenticate and build service
         click.echo("\nAuthenticating with Gmail...")
-        creds = authenticate_gmail(config)
-        service = build('gmail', 'v1', credentials=creds)
+        creds, service = get_service(config)
         
-        # Get sender email if not provided
-        if not sender:
-            sender = get_sender_email(service)
+        if batch_file:
+            batch_sender, gmail_signature = get_sender_profile(
+                service, creds, config,
+                need_email=not sender,
+                need_signature=signature,
+                refresh=refresh_profile
+            )
+            create_batch_drafts(service, sender or batch_sender, gmail_signature,
+                                input_format, entries)
+            return
         
-        click.echo(f"Creating draft from: {sender}")
+        # Look up sender email (if not provided) and signature (if requested)
+        # in the background while the body is converted to HTML
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            profile_future = executor.submit(
+                get_sender_profile, service, creds, config,
+                need_email=not sender,
+                need_signature=signature,
+                refresh=refresh_profile
+            )
+            
+            # Convert body to HTML based on input format; HTML input is used as is
+            if input_format == 'html':
+                body_html = body
+            else:
+                click.echo(f"Converting {input_format} content to HTML...")
+                body_html = convert_to_html(body, input_format)
+            
+            sender_email, gmail_signature = profile_future.result()
         
-        # Convert body to HTML based on input format
-        click.echo(f"Converting {input_format} content to HTML...")
-        body_html = convert_to_html(body, input_format)
+        sender = sender or sender_email
+        click.echo(f"Creating draft from: {sender}")
         
-        # Get Gmail signature if requested
-        gmail_signature = ''
         if signature:
-            click.echo("Retrieving Gmail signature...")
-            gmail_signature = get_gmail_signature(service)
             if gmail_signature:
                 click.echo("✓ Gmail signature retrieved")
             else:
@@ -1027,18 +1690,18 @@ def draft(to, subject, body, body_file, input_format, cc, bcc, attachment, sende
         if attachment:
             click.echo(f"Creating HTML draft with {len(attachment)} attachment(s)...")
             message = create_message_with_attachment(
-                sender, list(to), subject, body_html, 
-                list(cc) if cc else None, 
-                list(bcc) if bcc else None, 
-                list(attachment),
+                sender, to, subject, body_html, 
+                cc or None, 
+                bcc or None, 
+                attachment,
                 gmail_signature
             )
         else:
             click.echo("Creating HTML draft...")
             message = create_message(
-                sender, list(to), subject, body_html,
-                list(cc) if cc else None,
-                list(bcc) if bcc else None,
+                sender, to, subject, body_html,
+                cc or None,
+                bcc or None,
                 gmail_signature
             )
         
@@ -1065,7 +1728,7 @@ def draft(to, subject, body, body_file, input_format, cc, bcc, attachment, sende
 @click.option('--body', help='Reply body text')
 @click.option('--body-file', type=click.Path(exists=True), 
               help='Read reply body from file')
-@click.option('--input-format', type=click.Choice(['markdown', 'html', 'plaintext']), 
+@click.option('--input-format', type=click.Choice(INPUT_FORMATS), 
               default='markdown', help='Input format for reply body')
 @click.option('--reply-all', is_flag=True, help='Reply to all recipients')
 @click.option('--to', multiple=True, help='Additional TO recipients')
@@ -1076,9 +1739,11 @@ def draft(to, subject, body, body_file, input_format, cc, bcc, attachment, sende
 @click.option('--no-quote', is_flag=True, help='Don\'t include quoted original message')
 @click.option('--signature/--no-signature', default=True, 
               help='Include Gmail default signature')
+@click.option('--refresh-profile', is_flag=True,
+              help='Re-fetch sender email and signature instead of using the cached copy')
 @add_config_options
 def reply(message_id, thread_id, body, body_file, input_format, reply_all,
-          to, cc, bcc, attachment, no_quote, signature,
+          to, cc, bcc, attachment, no_quote, signature, refresh_profile, assume_yes,
           credentials_file, token_file, client_id, client_secret, config_file):
     """Reply to an existing email message or thread. Creates a draft reply."""
     
@@ -1096,36 +1761,13 @@ def reply(message_id, thread_id, body, body_file, input_format, reply_all,
         raise click.ClickException("Cannot specify both --body and --body-file")
     
     # Initialize configuration system
-    gmail_config = GmailConfig()
-    
-    try:
-        # Ensure config directory exists
-        gmail_config.ensure_config_dir()
-        
-        # Merge configuration from file, CLI args, and defaults
-        config = gmail_config.merge_config(
-            config_file_path=config_file,
-            credentials_file=credentials_file,
-            token_file=token_file,
-            client_id=client_id,
-            client_secret=client_secret
-        )
-        
-        # Validate configuration
-        gmail_config.validate_config(config)
-        
-        # Handle legacy token migration
-        gmail_config.migrate_legacy_token(config)
-        
-    except click.ClickException:
-        raise
-    except Exception as e:
-        raise click.ClickException(f"Configuration error: {e}")
+    config = _load_config(config_file, credentials_file, token_file,
+                          client_id, client_secret, assume_yes)
     
     # Read body from file if specified
     if body_file:
         try:
-            with open(body_file, 'r', encoding='utf-8') as f:
+            with open(body_file, 'r', encoding='utf-8', buffering=_FILE_BUFFER_SIZE) as f:
                 body = f.read()
         except Exception as e:
             raise click.ClickException(f"Error reading body file: {e}")
@@ -1133,8 +1775,7 @@ def reply(message_id, thread_id, body, body_file, input_format, reply_all,
     try:
         # Authenticate and build service
         click.echo("\nAuthenticating with Gmail...")
-        creds = authenticate_gmail(config)
-        service = build('gmail', 'v1', credentials=creds)
+        creds, service = get_service(config)
         
         # Get original message
         if message_id:
@@ -1151,19 +1792,27 @@ def reply(message_id, thread_id, body, body_file, input_format, reply_all,
             message_id = original_msg['id']
             click.echo(f"Replying to latest message in thread: {message_id}")
         
-        # Get sender email
-        sender = get_sender_email(service)
-        click.echo(f"Creating reply from: {sender}")
+        # Look up sender email and signature in the background while the
+        # body is converted to HTML
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            profile_future = executor.submit(
+                get_sender_profile, service, creds, config,
+                need_signature=signature,
+                refresh=refresh_profile
+            )
+            
+            # Convert body to HTML; HTML input is used as is
+            if input_format == 'html':
+                body_html = body
+            else:
+                click.echo(f"Converting {input_format} content to HTML...")
+                body_html = convert_to_html(body, input_format)
+            
+            sender, gmail_signature = profile_future.result()
         
-        # Convert body to HTML
-        click.echo(f"Converting {input_format} content to HTML...")
-        body_html = convert_to_html(body, input_format)
+        click.echo(f"Creating reply from: {sender}")
         
-        # Get signature if requested
-        gmail_signature = ''
         if signature:
-            click.echo("Retrieving Gmail signature...")
-            gmail_signature = get_gmail_signature(service)
             if gmail_signature:
                 click.echo("✓ Gmail signature retrieved")
             else:
@@ -1174,10 +1823,10 @@ def reply(message_id, thread_id, body, body_file, input_format, reply_all,
             click.echo(f"Creating reply draft with {len(attachment)} attachment(s)...")
             message = create_reply_message_with_attachment(
                 original_msg, sender, body_html, reply_all,
-                list(to) if to else None,
-                list(cc) if cc else None,
-                list(bcc) if bcc else None,
-                list(attachment),
+                to or None,
+                cc or None,
+                bcc or None,
+                attachment,
                 gmail_signature,
                 not no_quote
             )
@@ -1185,9 +1834,9 @@ def reply(message_id, thread_id, body, body_file, input_format, reply_all,
             click.echo("Creating reply draft...")
             message = create_reply_message(
                 original_msg, sender, body_html, reply_all,
-                list(to) if to else None,
-                list(cc) if cc else None,
-                list(bcc) if bcc else None,
+                to or None,
+                cc or None,
+                bcc or None,
                 gmail_signature,
                 not no_quote
             )